@@ -9,10 +9,17 @@ import plotly.express as px
 import numpy as np
 import time
 import hashlib
+import hmac
+import base64
 import json
 import tempfile
 import requests
+from requests.adapters import HTTPAdapter
 import urllib.parse
+try:
+    import orjson
+except ImportError:  # Optional speedup, fall back to the standard library
+    orjson = None
 from database import (
     save_data_to_db,
     load_data_from_db,
@@ -26,6 +33,35 @@ st.set_page_config(page_title="Cursor AI Metrics Analysis", layout="wide")
 # Load environment variables
 load_dotenv()
 
+# Credentials and OAuth settings are read once per process
+ADMIN_USERNAME = os.getenv('ADMIN_USERNAME')
+ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD')
+GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID')
+GOOGLE_CLIENT_SECRET = os.getenv('GOOGLE_CLIENT_SECRET')
+# Google Workspace domain whose accounts may sign in to the dashboard
+GOOGLE_WORKSPACE_DOMAIN = 'celigo.com'
+# Ensure no trailing slash for consistency
+REDIRECT_URI = (os.getenv('REDIRECT_URI') or '').rstrip('/')
+GOOGLE_AUTH_URL = (
+    f"https://accounts.google.com/o/oauth2/v2/auth?"
+    f"client_id={GOOGLE_CLIENT_ID}&"
+    f"redirect_uri={urllib.parse.quote(REDIRECT_URI)}&"
+    f"scope=openid email profile&"
+    f"response_type=code&"
+    f"access_type=offline&"
+    f"prompt=consent"
+)
+
+# Session file (de)serialization, using orjson when available
+if orjson is not None:
+    session_loads = orjson.loads
+    session_dumps = orjson.dumps
+else:
+    session_loads = json.loads
+
+    def session_dumps(sessions):
+        return json.dumps(sessions).encode()
+
 # Session management functions
 def get_session_file_path():
     """Get the path for storing session data"""
@@ -53,8 +89,8 @@ def save_session(token, username, expiry_hours=24):
     sessions = {}
     if os.path.exists(session_file):
         try:
-            with open(session_file, 'r') as f:
-                sessions = json.load(f)
+            with open(session_file, 'rb') as f:
+                sessions = session_loads(f.read())
         except:
             sessions = {}
     
@@ -79,8 +115,8 @@ def save_session(token, username, expiry_hours=24):
     
     # Save sessions
     try:
-        with open(session_file, 'w') as f:
-            json.dump(sessions, f)
+        with open(session_file, 'wb') as f:
+            f.write(session_dumps(sessions))
         return session_id  # Return session ID instead of boolean
     except:
         return None
@@ -95,8 +131,8 @@ def validate_session(token_or_session_id):
         return False
     
     try:
-        with open(session_file, 'r') as f:
-            sessions = json.load(f)
+        with open(session_file, 'rb') as f:
+            sessions = session_loads(f.read())
         
         # Check if it's a session ID (shorter, needs sid_ prefix lookup)
         session_key = f"sid_{token_or_session_id}" if len(token_or_session_id) == 12 else token_or_session_id
@@ -121,8 +157,8 @@ def validate_session(token_or_session_id):
                     del sessions[f"sid_{session_id}"]
             
             del sessions[session_key]
-            with open(session_file, 'w') as f:
-                json.dump(sessions, f)
+            with open(session_file, 'wb') as f:
+                f.write(session_dumps(sessions))
             return False
         
         return True
@@ -139,8 +175,8 @@ def get_token_from_session_id(session_id):
         return None
     
     try:
-        with open(session_file, 'r') as f:
-            sessions = json.load(f)
+        with open(session_file, 'rb') as f:
+            sessions = session_loads(f.read())
         
         session_key = f"sid_{session_id}"
         if session_key in sessions:
@@ -160,16 +196,35 @@ def clear_session(token):
         return
     
     try:
-        with open(session_file, 'r') as f:
-            sessions = json.load(f)
+        with open(session_file, 'rb') as f:
+            sessions = session_loads(f.read())
         
         if token in sessions:
             del sessions[token]
-            with open(session_file, 'w') as f:
-                json.dump(sessions, f)
+            with open(session_file, 'wb') as f:
+                f.write(session_dumps(sessions))
     except:
         pass
 
+# Seconds a successful session validation is trusted before the session file is read again
+SESSION_VALIDATION_TTL = 30
+
+def is_session_recently_validated(cache_key, token, session_id):
+    """Check if this token/session ID pair was validated within SESSION_VALIDATION_TTL"""
+    cached = st.session_state.get(cache_key)
+    return (cached is not None and
+            cached['token'] == token and
+            cached['session_id'] == session_id and
+            time.monotonic() - cached['validated_at'] < SESSION_VALIDATION_TTL)
+
+def mark_session_validated(cache_key, token, session_id):
+    """Remember a successful validation in session state"""
+    st.session_state[cache_key] = {
+        'token': token,
+        'session_id': session_id,
+        'validated_at': time.monotonic()
+    }
+
 def get_admin_session_token():
     """Get admin session token from URL session ID or session state"""
     
@@ -177,18 +232,25 @@ def get_admin_session_token():
     query_params = st.query_params
     session_id = query_params.get("sid")
     
+    # Skip the session file entirely if this session was validated moments ago
+    token = st.session_state.get('admin_session_token')
+    if token and is_session_recently_validated('admin_session_validated', token, session_id):
+        return token
+    
     if session_id and validate_session(session_id):
         # Get the actual token from session ID
         token = get_token_from_session_id(session_id)
         if token:
             # Store in session state for faster access
             st.session_state.admin_session_token = token
+            mark_session_validated('admin_session_validated', token, session_id)
             return token
     
     # Check session state (for same-session access)
     if 'admin_session_token' in st.session_state:
         token = st.session_state.admin_session_token
         if validate_session(token):
+            mark_session_validated('admin_session_validated', token, session_id)
             return token
         else:
             # Invalid token, clear it
@@ -204,70 +266,111 @@ if 'last_uploaded_file' not in st.session_state:
 
 def authenticate_admin(username, password):
     """Authenticate admin user against environment variables"""
-    return (username == os.getenv('ADMIN_USERNAME') and 
-            password == os.getenv('ADMIN_PASSWORD'))
+    if not ADMIN_USERNAME or not ADMIN_PASSWORD:
+        return False
+    # Constant-time comparisons; bitwise & so both are always evaluated
+    return (hmac.compare_digest(username.encode(), ADMIN_USERNAME.encode()) &
+            hmac.compare_digest(password.encode(), ADMIN_PASSWORD.encode()))
+
+# Shared HTTP session so Google OAuth calls reuse keep-alive connections
+OAUTH_HTTP = requests.Session()
+OAUTH_HTTP.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=4))
+OAUTH_TIMEOUT = (3.05, 10)  # (connect, read) seconds
 
 # Google OAuth functions
 def get_google_auth_url():
     """Generate Google OAuth authorization URL"""
-    client_id = os.getenv('GOOGLE_CLIENT_ID')
-    redirect_uri = os.getenv('REDIRECT_URI')
-    
-    # Ensure no trailing slash for consistency
-    if redirect_uri and redirect_uri.endswith('/'):
-        redirect_uri = redirect_uri[:-1]
-    
-    auth_url = (
-        f"https://accounts.google.com/o/oauth2/v2/auth?"
-        f"client_id={client_id}&"
-        f"redirect_uri={urllib.parse.quote(redirect_uri)}&"
-        f"scope=openid email profile&"
-        f"response_type=code&"
-        f"access_type=offline&"
-        f"prompt=consent"
-    )
-    return auth_url
+    return GOOGLE_AUTH_URL
 
 def exchange_code_for_token(auth_code):
     """Exchange authorization code for access token"""
-    client_id = os.getenv('GOOGLE_CLIENT_ID')
-    client_secret = os.getenv('GOOGLE_CLIENT_SECRET')
-    redirect_uri = os.getenv('REDIRECT_URI')
-    
-    # Ensure no trailing slash for consistency
-    if redirect_uri and redirect_uri.endswith('/'):
-        redirect_uri = redirect_uri[:-1]
-    
     token_url = "https://oauth2.googleapis.com/token"
     data = {
-        'client_id': client_id,
-        'client_secret': client_secret,
+        'client_id': GOOGLE_CLIENT_ID,
+        'client_secret': GOOGLE_CLIENT_SECRET,
         'code': auth_code,
         'grant_type': 'authorization_code',
-        'redirect_uri': redirect_uri
+        'redirect_uri': REDIRECT_URI
     }
     
     try:
-        response = requests.post(token_url, data=data)
+        response = OAUTH_HTTP.post(token_url, data=data, timeout=OAUTH_TIMEOUT)
         return response.json()
     except:
         return None
 
+def get_user_info_from_id_token(id_token):
+    """Get user information from the ID token returned with the access token"""
+    if not id_token:
+        return None
+    
+    try:
+        # The token comes straight from Google's token endpoint over TLS, so the
+        # payload can be read without a second round-trip to the userinfo API
+        payload_segment = id_token.split('.')[1]
+        payload_segment += '=' * (-len(payload_segment) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(payload_segment))
+    except:
+        return None
+    
+    # Only trust a verified address from the company's Workspace; anything else returns None
+    # so the caller falls back to the userinfo endpoint
+    if not payload.get('email') or payload.get('email_verified') is not True:
+        return None
+    if GOOGLE_WORKSPACE_DOMAIN and payload.get('hd') != GOOGLE_WORKSPACE_DOMAIN:
+        return None
+    return {
+        'email': payload['email'],
+        'name': payload.get('name', '')
+    }
+
 def get_user_info(access_token):
     """Get user information from Google"""
     user_info_url = f"https://www.googleapis.com/oauth2/v2/userinfo?access_token={access_token}"
     
     try:
-        response = requests.get(user_info_url)
+        response = OAUTH_HTTP.get(user_info_url, timeout=OAUTH_TIMEOUT)
         return response.json()
     except:
         return None
 
+@st.cache_resource
+def get_login_button_html(auth_url):
+    """Build the Google sign-in button markup once per auth URL"""
+    return f"""
+            <style>
+            .google-oauth-btn {{
+                background-color: #4285f4 !important;
+                color: #ffffff !important;
+                padding: 12px 24px;
+                text-decoration: none !important;
+                border-radius: 6px;
+                font-weight: bold !important;
+                display: block;
+                text-align: center;
+                font-size: 15px !important;
+                margin: 10px 0;
+                text-shadow: none !important;
+                border: none !important;
+                outline: none !important;
+            }}
+            .google-oauth-btn:hover,
+            .google-oauth-btn:visited,
+            .google-oauth-btn:active,
+            .google-oauth-btn:focus {{
+                color: #ffffff !important;
+                text-decoration: none !important;
+                background-color: #3367d6 !important;
+            }}
+            </style>
+            <a href="{auth_url}" target="_blank" class="google-oauth-btn">🔐 Sign in with Google</a>
+            """
+
 def is_celigo_employee(email):
     """Check if email belongs to Celigo"""
     if not email:
         return False
-    return email.lower().endswith('@celigo.com')
+    return email.lower().endswith(f'@{GOOGLE_WORKSPACE_DOMAIN}')
 
 def save_user_session(user_info, expiry_hours=24):
     """Save user session similar to admin session"""
@@ -282,8 +385,8 @@ def save_user_session(user_info, expiry_hours=24):
     sessions = {}
     if os.path.exists(session_file):
         try:
-            with open(session_file, 'r') as f:
-                sessions = json.load(f)
+            with open(session_file, 'rb') as f:
+                sessions = session_loads(f.read())
         except:
             sessions = {}
     
@@ -310,8 +413,8 @@ def save_user_session(user_info, expiry_hours=24):
     
     # Save sessions
     try:
-        with open(session_file, 'w') as f:
-            json.dump(sessions, f)
+        with open(session_file, 'wb') as f:
+            f.write(session_dumps(sessions))
         return session_id
     except:
         return None
@@ -323,18 +426,25 @@ def get_user_session_token():
     query_params = st.query_params
     user_session_id = query_params.get("user_sid")
     
+    # Skip the session file entirely if this session was validated moments ago
+    token = st.session_state.get('user_session_token')
+    if token and is_session_recently_validated('user_session_validated', token, user_session_id):
+        return token
+    
     if user_session_id and validate_user_session(user_session_id):
         # Get the actual token from session ID
         token = get_token_from_user_session_id(user_session_id)
         if token:
             # Store in session state for faster access
             st.session_state.user_session_token = token
+            mark_session_validated('user_session_validated', token, user_session_id)
             return token
     
     # Check session state
     if 'user_session_token' in st.session_state:
         token = st.session_state.user_session_token
         if validate_user_session(token):
+            mark_session_validated('user_session_validated', token, user_session_id)
             return token
         else:
             # Invalid token, clear it
@@ -352,8 +462,8 @@ def validate_user_session(token_or_session_id):
         return False
     
     try:
-        with open(session_file, 'r') as f:
-            sessions = json.load(f)
+        with open(session_file, 'rb') as f:
+            sessions = session_loads(f.read())
         
         # Check if it's a user session ID (needs user_sid_ prefix lookup)
         session_key = f"user_sid_{token_or_session_id}" if len(token_or_session_id) == 12 else token_or_session_id
@@ -378,8 +488,8 @@ def validate_user_session(token_or_session_id):
                     del sessions[f"user_sid_{session_id}"]
             
             del sessions[session_key]
-            with open(session_file, 'w') as f:
-                json.dump(sessions, f)
+            with open(session_file, 'wb') as f:
+                f.write(session_dumps(sessions))
             return False
         
         return True
@@ -396,8 +506,8 @@ def get_token_from_user_session_id(session_id):
         return None
     
     try:
-        with open(session_file, 'r') as f:
-            sessions = json.load(f)
+        with open(session_file, 'rb') as f:
+            sessions = session_loads(f.read())
         
         session_key = f"user_sid_{session_id}"
         if session_key in sessions:
@@ -417,8 +527,8 @@ def get_user_info_from_token(token):
         return None
     
     try:
-        with open(session_file, 'r') as f:
-            sessions = json.load(f)
+        with open(session_file, 'rb') as f:
+            sessions = session_loads(f.read())
         
         if token in sessions:
             session = sessions[token]
@@ -443,8 +553,8 @@ def clear_user_session(token):
         return
     
     try:
-        with open(session_file, 'r') as f:
-            sessions = json.load(f)
+        with open(session_file, 'rb') as f:
+            sessions = session_loads(f.read())
         
         if token in sessions:
             session = sessions[token]
@@ -457,8 +567,8 @@ def clear_user_session(token):
             # Remove main session
             del sessions[token]
             
-            with open(session_file, 'w') as f:
-                json.dump(sessions, f)
+            with open(session_file, 'wb') as f:
+                f.write(session_dumps(sessions))
     except:
         pass
 
@@ -466,13 +576,85 @@ def clear_user_session(token):
 query_params = st.query_params
 is_admin_route = query_params.get("route") == "admin"
 
+def _table_content_cache_key(df):
+    """Fingerprint of a table's exact contents, index and row order, much cheaper than serializing it"""
+    # Every column is hashed, so a manager reload or Is Active fix changes the key even when
+    # row counts and request totals stay the same
+    return (tuple(df.columns), pd.util.hash_pandas_object(df).to_numpy().tobytes())
+
+@st.cache_data(max_entries=64, hash_funcs={pd.DataFrame: _table_content_cache_key})
+def get_searchable_text(df):
+    """Get every column of a table as strings, converted once per table instead of once per search"""
+    return df.astype(str)
+
 def filter_dataframe_search(df, search_text):
     """Filter dataframe based on search text across all columns"""
     if search_text:
-        mask = df.astype(str).apply(lambda x: x.str.contains(search_text, case=False)).any(axis=1)
+        searchable = get_searchable_text(df)
+        mask = np.zeros(len(df), dtype=bool)
+        for column in searchable.columns:
+            mask |= searchable[column].str.contains(search_text, case=False).to_numpy()
         return df[mask]
     return df
 
+@st.cache_data(max_entries=64, hash_funcs={pd.DataFrame: _table_content_cache_key})
+def _cached_user_search(category_key, df, search_text):
+    return filter_dataframe_search(df, search_text)
+
+def search_user_list(category_key, df, search_text):
+    """Search a user list, caching results per (category, search text) across reruns"""
+    if not search_text:
+        return df
+    return _cached_user_search(category_key, df, search_text)
+
+@st.cache_data(max_entries=32, hash_funcs={pd.DataFrame: _table_content_cache_key})
+def get_csv_bytes(df):
+    """Serialize a user table for download, reusing the bytes across reruns"""
+    return df.to_csv(index=False).encode()
+
+# Expected CSV upload format
+CSV_DATE_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+# Only columns that cannot fail to parse are typed up front; Is Active and the request counts are
+# left to inference so bad cells reach COLUMN_VALIDATORS instead of raising inside read_csv
+CSV_DTYPES = {
+    'Email': 'string'
+}
+
+def read_metrics_csv(uploaded_file):
+    """Read an uploaded metrics CSV with typed columns and the Date column parsed up front"""
+    # Peek at the header so a missing Date column is reported by validate_dataframe
+    columns = pd.read_csv(uploaded_file, nrows=0).columns
+    uploaded_file.seek(0)
+    
+    return pd.read_csv(
+        uploaded_file,
+        dtype=CSV_DTYPES,
+        parse_dates=['Date'] if 'Date' in columns else False,
+        date_format=CSV_DATE_FORMAT,
+        engine='c'
+    )
+
+def _is_boolean(series, col):
+    """Return an error message if the column is not boolean (or 0/1 integer), else None"""
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(series):
+        return None
+    return f"'{col}' column must contain boolean values"
+
+def _is_nonneg_numeric(series, col):
+    """Return an error message if the column is not non-negative numeric, else None"""
+    if not pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+        return f"'{col}' column must contain numeric values"
+    if (series < 0).any():
+        return f"'{col}' column contains negative values"
+    return None
+
+# Per-column validators used by validate_dataframe
+COLUMN_VALIDATORS = {
+    'Is Active': _is_boolean,
+    'Subscription Included Reqs': _is_nonneg_numeric,
+    'Usage Based Reqs': _is_nonneg_numeric,
+}
+
 def validate_dataframe(df):
     """Validate DataFrame structure and content"""
     errors = []
@@ -484,31 +666,22 @@ def validate_dataframe(df):
         errors.append(f"Missing required columns: {', '.join(missing_columns)}")
         return errors
     
-    # Validate Date column
-    try:
-        df['Date'] = pd.to_datetime(df['Date'], format='%Y-%m-%dT%H:%M:%S.%fZ', utc=True)
-    except Exception as e:
-        errors.append(f"Invalid date format in 'Date' column. Expected format: YYYY-MM-DDThh:mm:ss.sssZ")
+    # Validate Date column (already parsed by read_metrics_csv unless a value failed to parse)
+    if not pd.api.types.is_datetime64_any_dtype(df['Date']):
+        try:
+            df['Date'] = pd.to_datetime(df['Date'], format=CSV_DATE_FORMAT, utc=True)
+        except Exception as e:
+            errors.append(f"Invalid date format in 'Date' column. Expected format: YYYY-MM-DDThh:mm:ss.sssZ")
     
     # Validate Email column
     if not df['Email'].str.contains('@').all():
         errors.append("Invalid email format found in 'Email' column")
     
-    # Validate Is Active column
-    if not df['Is Active'].dtype in ['bool', 'int64', 'int32']:
-        errors.append("'Is Active' column must contain boolean values")
-    
-    # Validate Subscription Included Reqs column
-    if not np.issubdtype(df['Subscription Included Reqs'].dtype, np.number):
-        errors.append("'Subscription Included Reqs' column must contain numeric values")
-    elif (df['Subscription Included Reqs'] < 0).any():
-        errors.append("'Subscription Included Reqs' column contains negative values")
-    
-    # Validate Usage Based Reqs column
-    if not np.issubdtype(df['Usage Based Reqs'].dtype, np.number):
-        errors.append("'Usage Based Reqs' column must contain numeric values")
-    elif (df['Usage Based Reqs'] < 0).any():
-        errors.append("'Usage Based Reqs' column contains negative values")
+    # Validate Is Active and request count columns
+    for col, validator in COLUMN_VALIDATORS.items():
+        error = validator(df[col], col)
+        if error:
+            errors.append(error)
     
     # Check for empty values
     for col in required_columns:
@@ -517,15 +690,23 @@ def validate_dataframe(df):
     
     return errors
 
+# The "previously active, not seen in current period" metric on the Charts page is hidden
+SHOW_PREVIOUSLY_ACTIVE_METRIC = False
+
+# Columns shown in the user list tables
+DISPLAY_COLUMNS = ['Email', 'Active Days', 'Subscription Included Reqs', 'Usage Based Reqs', 'Manager', 'Director', 'Department']
+
 def get_user_stats(filtered_df):
     """Get user statistics with manager information"""
     # First get active days count for each user
-    active_days = filtered_df.groupby(['Email', filtered_df['Date'].dt.date])['Is Active'].max().reset_index()
-    active_days = active_days[active_days['Is Active'] > 0].groupby('Email').size().reset_index()
+    # observed=True keeps categorical Email groupings to the users present in this frame;
+    # normalize() buckets by day on the datetime64 column instead of boxing Python dates
+    active_days = filtered_df.groupby(['Email', filtered_df['Date'].dt.normalize()], observed=True)['Is Active'].max().reset_index()
+    active_days = active_days[active_days['Is Active'] > 0].groupby('Email', observed=True).size().reset_index()
     active_days.columns = ['Email', 'Active Days']
     
     # Then get other stats
-    unique_users = filtered_df.groupby('Email').agg({
+    unique_users = filtered_df.groupby('Email', observed=True).agg({
         'Is Active': 'max',  # True if user was active on any day
         'Subscription Included Reqs': 'sum',  # Total subscription requests
         'Usage Based Reqs': 'sum',  # Total usage based requests
@@ -536,9 +717,80 @@ def get_user_stats(filtered_df):
     
     # Merge active days count with other stats
     unique_users = unique_users.merge(active_days, on='Email', how='left')
-    unique_users['Active Days'] = unique_users['Active Days'].fillna(0).astype(int)  # Convert to integer
+    unique_users['Active Days'] = unique_users['Active Days'].fillna(0).astype('int32')  # Convert to integer
     return unique_users
 
+@st.cache_data(ttl=3600, max_entries=16, hash_funcs={pd.DataFrame: _table_content_cache_key})
+def get_cached_user_stats(filtered_df):
+    """Get user statistics, reusing the result across reruns for the same filtered data"""
+    return get_user_stats(filtered_df)
+
+def get_available_months(df):
+    """Get month labels present in the data, newest first (formatted once per month, not per row)"""
+    month_periods = df['Date'].dt.to_period('M').unique()
+    return [period.strftime('%B %Y') for period in sorted(month_periods, reverse=True)]
+
+@st.cache_data(ttl=3600, max_entries=16, hash_funcs={pd.DataFrame: _table_content_cache_key})
+def get_daily_activity_counts(filtered_df):
+    """Get the number of active and inactive users for each day"""
+    # Whether each user was active on each day, bucketed with normalize() instead of per-row Python dates
+    daily_activity = filtered_df.groupby([filtered_df['Date'].dt.normalize(), 'Email'], observed=True)['Is Active'].max()
+    active_counts = daily_activity.groupby(level=0).sum().astype(int)
+    user_counts = daily_activity.groupby(level=0).size()
+    daily_counts = pd.DataFrame({
+        'Active': active_counts,
+        'Inactive': user_counts - active_counts
+    })
+    # Only the one-per-day index is converted to the date values the charts plot
+    daily_counts.index = pd.Index(daily_counts.index.date, name='Date')
+    return daily_counts
+
+# Bit flag of each user activity category in the packed per-user codes
+ACTIVITY_BITS = {
+    'active': 1,  # Made subscription or usage based requests
+    'dormant': 2,  # Opened Cursor but made no requests
+    'inactive': 4  # Didn't open Cursor at all
+}
+
+def get_activity_codes(user_stats):
+    """Get one uint8 per user with the bit of its activity category set"""
+    # Each comparison runs once on the raw arrays; the categories are cheap combinations of them
+    made_sub_reqs = user_stats['Subscription Included Reqs'].to_numpy() > 0
+    made_usage_reqs = user_stats['Usage Based Reqs'].to_numpy() > 0
+    opened_app = user_stats['Active Days'].to_numpy() > 0
+    has_requests = made_sub_reqs | made_usage_reqs
+    no_requests = ~has_requests
+    return (
+        has_requests.astype(np.uint8) * ACTIVITY_BITS['active']
+        | (opened_app & no_requests).astype(np.uint8) * ACTIVITY_BITS['dormant']
+        | (~opened_app & no_requests).astype(np.uint8) * ACTIVITY_BITS['inactive']
+    )
+
+def get_activity_masks(activity_codes):
+    """Unpack activity codes into positional boolean arrays for active, dormant and inactive users"""
+    return {category: (activity_codes & bit) != 0 for category, bit in ACTIVITY_BITS.items()}
+
+def count_activity_categories(activity_codes):
+    """Count users in each activity category with a single bincount over the codes"""
+    counts = np.bincount(activity_codes, minlength=max(ACTIVITY_BITS.values()) + 1)
+    return {category: int(counts[bit]) for category, bit in ACTIVITY_BITS.items()}
+
+def slice_time_range(df, start_ts, end_ts):
+    """Get rows of a Date-sorted frame with start_ts <= Date < end_ts, using binary search"""
+    lo, hi = df['Date'].searchsorted([start_ts, end_ts])
+    return df.iloc[lo:hi]
+
+def slice_date_range(df, start_date, end_date):
+    """Get rows of a Date-sorted frame falling on start_date..end_date (inclusive)"""
+    tz = df['Date'].dt.tz
+    start_ts = pd.Timestamp(start_date, tz=tz)
+    end_ts = pd.Timestamp(end_date, tz=tz) + pd.Timedelta(days=1)
+    return slice_time_range(df, start_ts, end_ts)
+
+def section_break():
+    """Separate page sections with a single horizontal rule element"""
+    st.markdown("---")
+
 # Handle Google OAuth for main dashboard (non-admin)
 if not is_admin_route:
     # Check for Google OAuth callback
@@ -549,7 +801,10 @@ if not is_admin_route:
         # Handle OAuth callback
         token_response = exchange_code_for_token(auth_code)
         if token_response and 'access_token' in token_response:
-            user_info = get_user_info(token_response['access_token'])
+            user_info = get_user_info_from_id_token(token_response.get('id_token'))
+            if not user_info:
+                # Fall back to the userinfo endpoint if the ID token is missing or unreadable
+                user_info = get_user_info(token_response['access_token'])
             if user_info and is_celigo_employee(user_info.get('email')):
                 # Valid Celigo employee, create session
                 user_session_id = save_user_session(user_info)
@@ -615,7 +870,7 @@ if not is_admin_route:
         # Create Google OAuth login button
         auth_url = get_google_auth_url()
         
-        st.markdown(f"""
+        st.markdown("""
         <div class="login-container">
             <h1 class="login-title">Cursor AI Metrics Analysis</h1>
             <p class="login-subtitle">Welcome to Celigo's Cursor AI Analytics Dashboard</p>
@@ -627,34 +882,7 @@ if not is_admin_route:
         col1, col2, col3 = st.columns([1, 1, 1])
         
         with col2:
-            st.markdown(f"""
-            <style>
-            .google-oauth-btn {{
-                background-color: #4285f4 !important;
-                color: #ffffff !important;
-                padding: 12px 24px;
-                text-decoration: none !important;
-                border-radius: 6px;
-                font-weight: bold !important;
-                display: block;
-                text-align: center;
-                font-size: 15px !important;
-                margin: 10px 0;
-                text-shadow: none !important;
-                border: none !important;
-                outline: none !important;
-            }}
-            .google-oauth-btn:hover,
-            .google-oauth-btn:visited,
-            .google-oauth-btn:active,
-            .google-oauth-btn:focus {{
-                color: #ffffff !important;
-                text-decoration: none !important;
-                background-color: #3367d6 !important;
-            }}
-            </style>
-            <a href="{auth_url}" target="_blank" class="google-oauth-btn">🔐 Sign in with Google</a>
-            """, unsafe_allow_html=True)
+            st.markdown(get_login_button_html(auth_url), unsafe_allow_html=True)
         
         st.markdown("""
         <p style="text-align: center; font-size: 12px; color: #666; margin-top: 10px;">
@@ -678,6 +906,7 @@ if not is_admin_route:
             clear_user_session(user_token)
             if 'user_session_token' in st.session_state:
                 del st.session_state.user_session_token
+            st.session_state.pop('user_session_validated', None)
             # Clear user session ID from URL
             if "user_sid" in st.query_params:
                 del st.query_params.user_sid
@@ -726,8 +955,8 @@ if is_admin_route:
         session_file = get_session_file_path()
         if os.path.exists(session_file) and session_token:
             try:
-                with open(session_file, 'r') as f:
-                    sessions = json.load(f)
+                with open(session_file, 'rb') as f:
+                    sessions = session_loads(f.read())
                 if session_token in sessions:
                     session_info = sessions[session_token]
                     expiry_time = datetime.fromisoformat(session_info['expiry'])
@@ -820,7 +1049,7 @@ if is_admin_route:
             
             if uploaded_file is not None and not st.session_state.upload_success:
                 try:
-                    df = pd.read_csv(uploaded_file)
+                    df = read_metrics_csv(uploaded_file)
                     # Validate data
                     errors = validate_dataframe(df)
                     if errors:
@@ -851,6 +1080,7 @@ if is_admin_route:
             if 'admin_session_token' in st.session_state:
                 clear_session(st.session_state.admin_session_token)
                 del st.session_state.admin_session_token
+            st.session_state.pop('admin_session_validated', None)
             
             # Clear session ID from URL
             st.query_params.route = "admin"
@@ -874,9 +1104,6 @@ elif page == "Charts":
         # Convert Date column to datetime
         df['Date'] = pd.to_datetime(df['Date'])
         
-        # Add month-year column for grouping
-        df['Month-Year'] = df['Date'].dt.strftime('%B %Y')
-        
         # Initialize variables used across sections
         start_date = None
         end_date = None
@@ -890,8 +1117,8 @@ elif page == "Charts":
         
         if filter_type == "Date Range":
             # Get min and max dates from data
-            min_date = df['Date'].dt.date.min()
-            max_date = df['Date'].dt.date.max()
+            min_date = df['Date'].min().date()
+            max_date = df['Date'].max().date()
             
             # Create date inputs with min/max restrictions
             start_date = st.sidebar.date_input(
@@ -919,25 +1146,15 @@ elif page == "Charts":
                 end_date = min(end_date, max_date)
             
             # Filter data for selected date range
-            df_filtered = df[
-                (df['Date'].dt.date >= start_date) & 
-                (df['Date'].dt.date <= end_date)
-            ].copy()
+            df_filtered = slice_date_range(df, start_date, end_date)
             
             # Display selected date range info
-            st.caption(f"📅 Showing data for: {start_date:%B %d, %Y} to {end_date:%B %d, %Y}")
+            date_display = f"📅 Showing data for: {start_date:%B %d, %Y} to {end_date:%B %d, %Y}"
+            st.caption(date_display)
             
         elif filter_type == "Month":  # Month selection
-            # Create Month-Year column with the correct date
-            month_year_dates = pd.to_datetime(df['Date'])
-            df['Month-Year'] = month_year_dates.dt.strftime('%B %Y')
-            
             # Get unique months in reverse chronological order
-            available_months = sorted(
-                df['Month-Year'].unique(),
-                key=lambda x: pd.to_datetime(x + " 1", format='%B %Y %d'),  # Add day for proper parsing
-                reverse=True
-            )
+            available_months = get_available_months(df)
             
             selected_month = st.sidebar.selectbox(
                 "Select Month",
@@ -945,65 +1162,46 @@ elif page == "Charts":
             )
             
             # Filter data for selected month
-            month_start = pd.to_datetime(selected_month + " 1", format='%B %Y %d')
-            month_end = month_start + pd.offsets.MonthEnd(0)
+            month_start = pd.to_datetime(selected_month + " 1", format='%B %Y %d').tz_localize(df['Date'].dt.tz)
+            month_end = month_start + pd.offsets.MonthBegin(1)
             
             # Filter using the full datetime to ensure correct month and year
-            df_filtered = df[
-                (df['Date'].dt.to_period('M') == month_start.to_period('M'))
-            ].copy()
+            df_filtered = slice_time_range(df, month_start, month_end)
             
             # Display selected month info
-            st.caption(f"📅 Showing data for: {selected_month}")
+            date_display = f"📅 Showing data for: {selected_month}"
+            st.caption(date_display)
             
         else:  # Until Today
             # Calculate the earliest date from the data
-            earliest_date = df['Date'].dt.date.min()
+            earliest_date = df['Date'].min().date()
             today = datetime.now().date()
             
             # Ensure today is not beyond the max date in the data
-            max_date = df['Date'].dt.date.max()
+            max_date = df['Date'].max().date()
             if today > max_date:
                 today = max_date
                 st.sidebar.info(f"Showing data until the latest available date: {max_date:%B %d, %Y}")
             
             # Filter data from earliest date until today
-            df_filtered = df[
-                (df['Date'].dt.date >= earliest_date) & 
-                (df['Date'].dt.date <= today)
-            ].copy()
+            df_filtered = slice_date_range(df, earliest_date, today)
             
             # Display date range info
-            st.caption(f"📅 Showing data from {earliest_date:%B %d, %Y} until {today:%B %d, %Y}")
+            date_display = f"📅 Showing data from {earliest_date:%B %d, %Y} until {today:%B %d, %Y}"
+            st.caption(date_display)
             
             # Set start_date and end_date for later use
             start_date = earliest_date
             end_date = today
             
         # Get user statistics
-        user_stats = get_user_stats(df_filtered)
+        user_stats = get_cached_user_stats(df_filtered)
         
         if isinstance(user_stats, pd.DataFrame):
-            # Calculate usage percentages
-            def get_usage_percentage(active_days):
-                if active_days >= 20:
-                    return "100% (20+ days)"
-                elif active_days >= 15:
-                    return "75% (15-19 days)"
-                elif active_days >= 10:
-                    return "50% (10-14 days)"
-                elif active_days >= 5:
-                    return "25% (5-9 days)"
-                else:
-                    return "< 25% (< 5 days)"
-            
-            # Add usage percentage column
-            user_stats['Usage Level'] = user_stats['Active Days'].apply(get_usage_percentage)
-            
-            # Calculate distribution
-            usage_distribution = user_stats['Usage Level'].value_counts()
+            # Sort once so every user list below is already in display order
+            user_stats = user_stats.sort_values(['Active Days', 'Email'], ascending=[False, True]).reset_index(drop=True)
             
-            # Sort the index in descending order of usage percentage
+            # Usage levels in descending order of usage percentage
             usage_levels = [
                 '100% (20+ days)', 
                 '75% (15-19 days)', 
@@ -1011,8 +1209,25 @@ elif page == "Charts":
                 '25% (5-9 days)',
                 '< 25% (< 5 days)'
             ]
+            
+            # Add usage percentage column (bins: <5, 5-9, 10-14, 15-19, 20+ active days)
+            user_stats['Usage Level'] = pd.cut(
+                user_stats['Active Days'],
+                bins=[-1, 4, 9, 14, 19, np.inf],
+                labels=usage_levels[::-1]
+            )
+            
+            # Calculate distribution
+            usage_distribution = user_stats['Usage Level'].value_counts()
             usage_distribution = usage_distribution.reindex(usage_levels).fillna(0)
             
+            # Project the table columns once; all user lists below are row slices of this view
+            user_view = user_stats[DISPLAY_COLUMNS]
+            
+            # Users in each usage level, split in a single pass
+            users_by_level = dict(list(user_view.groupby(user_stats['Usage Level'], observed=True)))
+            no_users = user_view.iloc[:0]
+            
             # Create color map for usage levels
             colors = {
                 '100% (20+ days)': '#2ecc71',  # Green
@@ -1022,17 +1237,16 @@ elif page == "Charts":
                 '< 25% (< 5 days)': '#e74c3c'   # Red
             }
             
+            # Hover text with the top 10 users of each usage level, shared by both chart types
+            top_users = user_stats.groupby('Usage Level', observed=True).head(10)
+            hover_text = top_users.groupby('Usage Level', observed=True)['Email'].agg(
+                lambda emails: "<br>".join(f"{i+1}. {email}" for i, email in enumerate(emails.astype(str)))
+            ).reindex(usage_levels, fill_value='').tolist()
+            
             # Create tabs for different chart types
             chart_type = st.radio("Select Chart Type", ["Bar Chart", "Pie Chart"], horizontal=True)
             
             if chart_type == "Bar Chart":
-                # Create hover text for each usage level
-                hover_text = []
-                for level in usage_distribution.index:
-                    users_df = user_stats[user_stats['Usage Level'] == level]
-                    users = users_df['Email'].astype(str).head(10).tolist()
-                    hover_text.append("<br>".join(f"{i+1}. {email}" for i, email in enumerate(users)))
-
                 # Create bar chart using Plotly
                 fig = go.Figure()
                 fig.add_trace(go.Bar(
@@ -1077,13 +1291,6 @@ elif page == "Charts":
                 st.plotly_chart(fig, use_container_width=True)
                 
             else:  # Pie Chart
-                # Create hover text for each usage level
-                hover_text = []
-                for level in usage_distribution.index:
-                    users_df = user_stats[user_stats['Usage Level'] == level]
-                    users = users_df['Email'].astype(str).head(10).tolist()
-                    hover_text.append("<br>".join(f"{i+1}. {email}" for i, email in enumerate(users)))
-
                 # Calculate percentages for pie chart
                 total_users = usage_distribution.sum()
                 percentages = (usage_distribution / total_users * 100).round(1)
@@ -1141,72 +1348,71 @@ elif page == "Charts":
             
             # 100% Usage Users
             with st.expander("100% Usage (20+ days active)", expanded=False):
-                users_100 = user_stats[user_stats['Active Days'] >= 20]
+                users_100 = users_by_level.get('100% (20+ days)', no_users)
                 if not users_100.empty:
                     search_100 = st.text_input("Search in 100% Usage category", key="search_100")
-                    filtered_100 = filter_dataframe_search(users_100[['Email', 'Active Days', 'Subscription Included Reqs', 'Usage Based Reqs', 'Manager', 'Director', 'Department']], search_100)
+                    filtered_100 = search_user_list("search_100", users_100, search_100)
                     if filtered_100.empty:
                         st.info("No matching users found")
                     else:
-                        st.dataframe(filtered_100.sort_values('Active Days', ascending=False), width=1200)
+                        st.dataframe(filtered_100, width=1200)
                 else:
                     st.info("No users in this category")
             
             # 75% Usage Users
             with st.expander("75% Usage (15-19 days active)", expanded=False):
-                users_75 = user_stats[(user_stats['Active Days'] >= 15) & (user_stats['Active Days'] < 20)]
+                users_75 = users_by_level.get('75% (15-19 days)', no_users)
                 if not users_75.empty:
                     search_75 = st.text_input("Search in 75% Usage category", key="search_75")
-                    filtered_75 = filter_dataframe_search(users_75[['Email', 'Active Days', 'Subscription Included Reqs', 'Usage Based Reqs', 'Manager', 'Director', 'Department']], search_75)
+                    filtered_75 = search_user_list("search_75", users_75, search_75)
                     if filtered_75.empty:
                         st.info("No matching users found")
                     else:
-                        st.dataframe(filtered_75.sort_values('Active Days', ascending=False), width=1200)
+                        st.dataframe(filtered_75, width=1200)
                 else:
                     st.info("No users in this category")
             
             # 50% Usage Users
             with st.expander("50% Usage (10-14 days active)", expanded=False):
-                users_50 = user_stats[(user_stats['Active Days'] >= 10) & (user_stats['Active Days'] < 15)]
+                users_50 = users_by_level.get('50% (10-14 days)', no_users)
                 if not users_50.empty:
                     search_50 = st.text_input("Search in 50% Usage category", key="search_50")
-                    filtered_50 = filter_dataframe_search(users_50[['Email', 'Active Days', 'Subscription Included Reqs', 'Usage Based Reqs', 'Manager', 'Director', 'Department']], search_50)
+                    filtered_50 = search_user_list("search_50", users_50, search_50)
                     if filtered_50.empty:
                         st.info("No matching users found")
                     else:
-                        st.dataframe(filtered_50.sort_values('Active Days', ascending=False), width=1200)
+                        st.dataframe(filtered_50, width=1200)
                 else:
                     st.info("No users in this category")
             
             # 25% Usage Users
             with st.expander("25% Usage (5-9 days active)", expanded=False):
-                users_25 = user_stats[(user_stats['Active Days'] >= 5) & (user_stats['Active Days'] < 10)]
+                users_25 = users_by_level.get('25% (5-9 days)', no_users)
                 if not users_25.empty:
                     search_25 = st.text_input("Search in 25% Usage category", key="search_25")
-                    filtered_25 = filter_dataframe_search(users_25[['Email', 'Active Days', 'Subscription Included Reqs', 'Usage Based Reqs', 'Manager', 'Director', 'Department']], search_25)
+                    filtered_25 = search_user_list("search_25", users_25, search_25)
                     if filtered_25.empty:
                         st.info("No matching users found")
                     else:
-                        st.dataframe(filtered_25.sort_values('Active Days', ascending=False), width=1200)
+                        st.dataframe(filtered_25, width=1200)
                 else:
                     st.info("No users in this category")
             
             # < 25% Usage Users
             with st.expander("< 25% Usage (< 5 days active)", expanded=False):
-                users_less_25 = user_stats[user_stats['Active Days'] < 5]
+                users_less_25 = users_by_level.get('< 25% (< 5 days)', no_users)
                 if not users_less_25.empty:
                     search_less_25 = st.text_input("Search in < 25% Usage category", key="search_less_25")
-                    filtered_less_25 = filter_dataframe_search(users_less_25[['Email', 'Active Days', 'Subscription Included Reqs', 'Usage Based Reqs', 'Manager', 'Director', 'Department']], search_less_25)
+                    filtered_less_25 = search_user_list("search_less_25", users_less_25, search_less_25)
                     if filtered_less_25.empty:
                         st.info("No matching users found")
                     else:
-                        st.dataframe(filtered_less_25.sort_values('Active Days', ascending=False), width=1200)
+                        st.dataframe(filtered_less_25, width=1200)
                 else:
                     st.info("No users in this category")
             
             # Add spacing before next section
-            st.write("")
-            st.markdown("---")
+            section_break()
             
             # Display summary statistics
             st.subheader("Activity Level Summary")
@@ -1217,17 +1423,20 @@ elif page == "Charts":
             # Display total users in a prominent way
             st.markdown(f"**👥 Total Users: {total_users}**")
             
-            # Calculate dormant users if not already calculated
-            if 'dormant_users' not in locals():
-                dormant_users = df[~df['Email'].isin(user_stats['Email'])]['Email'].unique()
+            # Users seen before but not in the current period (only needed by the hidden metric below)
+            if SHOW_PREVIOUSLY_ACTIVE_METRIC:
+                dormant_users = np.fromiter(
+                    set(df['Email'].unique()) - set(user_stats['Email'].unique()),
+                    dtype=object
+                )
                 total_dormant = len(dormant_users)
             
             # Calculate percentages for each category including dormant users
-            highly_active = len(user_stats[user_stats['Active Days'] >= 20])
-            regular_users = len(user_stats[(user_stats['Active Days'] >= 15) & (user_stats['Active Days'] < 20)])
-            moderate_users = len(user_stats[(user_stats['Active Days'] >= 10) & (user_stats['Active Days'] < 15)])
-            light_users = len(user_stats[(user_stats['Active Days'] >= 5) & (user_stats['Active Days'] < 10)])
-            minimal_users = len(user_stats[user_stats['Active Days'] < 5])
+            highly_active = int(usage_distribution['100% (20+ days)'])
+            regular_users = int(usage_distribution['75% (15-19 days)'])
+            moderate_users = int(usage_distribution['50% (10-14 days)'])
+            light_users = int(usage_distribution['25% (5-9 days)'])
+            minimal_users = int(usage_distribution['< 25% (< 5 days)'])
             
             # Create columns for the metrics
             col1, col2, col3, col4, col5 = st.columns(5)
@@ -1272,7 +1481,7 @@ elif page == "Charts":
                     help="Users active for less than 5 days"
                 )
             
-            # Commenting out dormant users metric
+            # Commenting out dormant users metric (re-enable together with SHOW_PREVIOUSLY_ACTIVE_METRIC)
             # with col6:
             #     st.metric(
             #         "Dormant",
@@ -1282,40 +1491,29 @@ elif page == "Charts":
             #     )
             
             # Add spacing and section divider
-            st.write("")
-            st.markdown("---")
+            section_break()
             
             # User Activity Analysis Section
             st.subheader("📊 Active, Inactive & Dormant Users Analysis")
             
-            # Get date display based on filter type
-            if filter_type == "Month":
-                date_display = f"📅 Showing data for: {selected_month}"
-            elif filter_type == "Until Today":
-                date_display = f"📅 Showing data from {earliest_date:%B %d, %Y} until {today:%B %d, %Y}"
-            else:  # Date Range
-                date_display = f"📅 Showing data for: {start_date:%B %d, %Y} to {end_date:%B %d, %Y}"
-            
             st.markdown(f"*{date_display}*")
             
-            # Calculate user categories
-            period_user_stats = get_user_stats(df_filtered)
-            active_users = period_user_stats[
-                (period_user_stats['Subscription Included Reqs'] > 0) | 
-                (period_user_stats['Usage Based Reqs'] > 0)
-            ]
+            # Calculate user categories (masks computed once, reused by the lists below)
+            activity_codes = get_activity_codes(user_stats)
+            activity_masks = get_activity_masks(activity_codes)
+            active_users = user_view[activity_masks['active']]
             # Dormant users are those who were active (opened the app) but made no requests
-            dormant_users = period_user_stats[
-                (period_user_stats['Active Days'] > 0) & 
-                (period_user_stats['Subscription Included Reqs'] == 0) &
-                (period_user_stats['Usage Based Reqs'] == 0)
-            ]
-            # Inactive users are those who didn't open the app at all
-            inactive_users = period_user_stats[period_user_stats['Is Active'] == 0]
-            
-            total_active = len(active_users)
+            dormant_users = user_view[activity_masks['dormant']]
+            # Inactive users are those who didn't open the app at all (Is Active never set); unlike
+            # the inactive mask this ignores request counts, as the summary always has
+            inactive_users = user_view[user_stats['Is Active'].to_numpy() == 0]
+            # The "View Inactive Users" list also requires no requests of either type
+            no_activity_users = user_view[activity_masks['inactive']]
+            
+            activity_counts = count_activity_categories(activity_codes)
+            total_active = activity_counts['active']
             total_inactive = len(inactive_users)
-            total_dormant = len(dormant_users)
+            total_dormant = activity_counts['dormant']
             period_total = total_active + total_inactive + total_dormant
             
             # Display summary
@@ -1354,178 +1552,159 @@ elif page == "Charts":
             
             # Display active users list
             with st.expander("View Active Users", expanded=False):
-                # Get active users - those who have made either type of requests
-                active_df = period_user_stats[
-                    (period_user_stats['Subscription Included Reqs'] > 0) |
-                    (period_user_stats['Usage Based Reqs'] > 0)
-                ]
-                
-                if not active_df.empty:
+                if not active_users.empty:
                     search_active = st.text_input("Search active users", key="search_active")
-                    filtered_active = filter_dataframe_search(active_df[['Email', 'Active Days', 'Subscription Included Reqs', 'Usage Based Reqs', 'Manager', 'Director', 'Department']], search_active)
+                    filtered_active = search_user_list("search_active", active_users, search_active)
                     if filtered_active.empty:
                         st.info("No matching users found")
                     else:
-                        st.dataframe(filtered_active.sort_values(['Active Days', 'Email'], ascending=[False, True]), width=1200)
+                        st.dataframe(filtered_active, width=1200)
                 else:
                     st.info("No active users found")
             
             # Inactive Users List
             with st.expander("View Inactive Users", expanded=False):
-                # Get inactive users - those who didn't open the app and made no requests
-                inactive_df = period_user_stats[
-                    (period_user_stats['Active Days'] == 0) &
-                    (period_user_stats['Subscription Included Reqs'] == 0) &
-                    (period_user_stats['Usage Based Reqs'] == 0)
-                ]
-                
-                if not inactive_df.empty:
+                if not no_activity_users.empty:
                     search_inactive = st.text_input("Search inactive users", key="search_inactive")
-                    filtered_inactive = filter_dataframe_search(inactive_df[['Email', 'Active Days', 'Subscription Included Reqs', 'Usage Based Reqs', 'Manager', 'Director', 'Department']], search_inactive)
+                    filtered_inactive = search_user_list("search_inactive", no_activity_users, search_inactive)
                     if filtered_inactive.empty:
                         st.info("No matching users found")
                     else:
-                        st.dataframe(filtered_inactive.sort_values(['Active Days', 'Email'], ascending=[False, True]), width=1200)
+                        st.dataframe(filtered_inactive, width=1200)
                 else:
                     st.info("No inactive users found")
             
             # Dormant Users List
             with st.expander("View Dormant Users", expanded=False):
-                # Get dormant users - those who were active but made no requests of either type
-                dormant_df = period_user_stats[
-                    (period_user_stats['Active Days'] > 0) & 
-                    (period_user_stats['Subscription Included Reqs'] == 0) &
-                    (period_user_stats['Usage Based Reqs'] == 0)
-                ]
-                
-                if not dormant_df.empty:
+                if not dormant_users.empty:
                     search_dormant = st.text_input("Search dormant users", key="search_dormant")
-                    filtered_dormant = filter_dataframe_search(dormant_df[['Email', 'Active Days', 'Subscription Included Reqs', 'Usage Based Reqs', 'Manager', 'Director', 'Department']], search_dormant)
+                    filtered_dormant = search_user_list("search_dormant", dormant_users, search_dormant)
                     if filtered_dormant.empty:
                         st.info("No matching users found")
                     else:
-                        st.dataframe(filtered_dormant.sort_values(['Active Days', 'Email'], ascending=[False, True]), width=1200)
+                        st.dataframe(filtered_dormant, width=1200)
                 else:
                     st.info("No dormant users found")
             
             # Add spacing before next section
-            st.write("")
-            st.markdown("---")
+            section_break()
 
             # Active Users Analysis Section
             st.header("📈 Active Users Analysis")
             
-            # Calculate active users trend
-            active_by_date = df_filtered.groupby(df_filtered['Date'].dt.date).apply(
-                lambda x: len(get_user_stats(x)[get_user_stats(x)['Active Days'] > 0])
-            ).reset_index()
-            active_by_date.columns = ['Date', 'Count']
-            
-            # Create trend chart
-            active_trend_fig = go.Figure()
-            
-            # Add line trace for trend
-            active_trend_fig.add_trace(go.Scatter(
-                x=active_by_date['Date'],
-                y=active_by_date['Count'],
-                mode='lines+markers',  # Show both line and points
-                line=dict(
-                    color='#2ecc71',  # Green color for consistency
-                    width=2
-                ),
-                marker=dict(
-                    size=6,
-                    color='#2ecc71',
-                ),
-                name='Active Users'
-            ))
+            # Trend charts are only built when requested, sharing one per-day aggregation
+            daily_counts = None
+            
+            if st.toggle("Show daily active users trend", key="show_active_trend"):
+                # Calculate active users trend
+                daily_counts = get_daily_activity_counts(df_filtered)
+                active_by_date = daily_counts['Active'].reset_index()
+                active_by_date.columns = ['Date', 'Count']
+            
+                # Create trend chart
+                active_trend_fig = go.Figure()
+            
+                # Add line trace for trend
+                active_trend_fig.add_trace(go.Scatter(
+                    x=active_by_date['Date'],
+                    y=active_by_date['Count'],
+                    mode='lines+markers',  # Show both line and points
+                    line=dict(
+                        color='#2ecc71',  # Green color for consistency
+                        width=2
+                    ),
+                    marker=dict(
+                        size=6,
+                        color='#2ecc71',
+                    ),
+                    name='Active Users'
+                ))
 
-            # Update layout
-            active_trend_fig.update_layout(
-                title=f"Daily Active Users Trend - {date_display}",
-                xaxis_title="Date",
-                yaxis_title="Number of Active Users",
-                showlegend=False,
-                hovermode='x unified'  # Show hover for all points at same x-value
-            )
+                # Update layout
+                active_trend_fig.update_layout(
+                    title=f"Daily Active Users Trend - {date_display}",
+                    xaxis_title="Date",
+                    yaxis_title="Number of Active Users",
+                    showlegend=False,
+                    hovermode='x unified'  # Show hover for all points at same x-value
+                )
             
-            # Show the trend plot
-            st.plotly_chart(active_trend_fig, use_container_width=True)
+                # Show the trend plot
+                st.plotly_chart(active_trend_fig, use_container_width=True)
             
             # Add expandable section for active users list
             st.subheader("Detailed Active Users List")
             with st.expander("View All Active Users", expanded=False):
                 if not active_users.empty:
                     search_active_detail = st.text_input("Search active users", key="search_active_detail")
-                    filtered_active_detail = filter_dataframe_search(active_users[['Email', 'Active Days', 'Subscription Included Reqs', 'Usage Based Reqs', 'Manager', 'Director', 'Department']], search_active_detail)
+                    filtered_active_detail = search_user_list("search_active_detail", active_users, search_active_detail)
                     if filtered_active_detail.empty:
                         st.info("No matching users found")
                     else:
-                        st.dataframe(filtered_active_detail.sort_values(['Active Days', 'Email'], ascending=[False, True]), width=1200)
+                        st.dataframe(filtered_active_detail, width=1200)
                 else:
                     st.info("No active users found in this period")
             
             # Add spacing before next section
-            st.write("")
-            st.markdown("---")
+            section_break()
 
             # Separate Inactive Users Analysis Section
             st.header("📉 Inactive Users Analysis")
             st.markdown(f"*{date_display}*")  # Add date info
             
-            # Calculate inactive users trend
-            inactive_by_date = df_filtered.groupby(df_filtered['Date'].dt.date).apply(
-                lambda x: len(get_user_stats(x)[get_user_stats(x)['Active Days'] == 0])
-            ).reset_index()
-            inactive_by_date.columns = ['Date', 'Count']
-            
-            # Create trend chart
-            trend_fig = go.Figure()
-            
-            # Add line trace for trend
-            trend_fig.add_trace(go.Scatter(
-                x=inactive_by_date['Date'],
-                y=inactive_by_date['Count'],
-                mode='lines+markers',  # Show both line and points
-                line=dict(
-                    color='#e74c3c',  # Red color for consistency
-                    width=2
-                ),
-                marker=dict(
-                    size=6,
-                    color='#e74c3c',
-                ),
-                name='Inactive Users'
-            ))
+            if st.toggle("Show daily inactive users trend", key="show_inactive_trend"):
+                # Calculate inactive users trend
+                if daily_counts is None:
+                    daily_counts = get_daily_activity_counts(df_filtered)
+                inactive_by_date = daily_counts['Inactive'].reset_index()
+                inactive_by_date.columns = ['Date', 'Count']
+            
+                # Create trend chart
+                trend_fig = go.Figure()
+            
+                # Add line trace for trend
+                trend_fig.add_trace(go.Scatter(
+                    x=inactive_by_date['Date'],
+                    y=inactive_by_date['Count'],
+                    mode='lines+markers',  # Show both line and points
+                    line=dict(
+                        color='#e74c3c',  # Red color for consistency
+                        width=2
+                    ),
+                    marker=dict(
+                        size=6,
+                        color='#e74c3c',
+                    ),
+                    name='Inactive Users'
+                ))
 
-            # Update layout
-            trend_fig.update_layout(
-                title=f"Daily Inactive Users Trend - {date_display}",
-                xaxis_title="Date",
-                yaxis_title="Number of Inactive Users",
-                showlegend=False,
-                hovermode='x unified'  # Show hover for all points at same x-value
-            )
+                # Update layout
+                trend_fig.update_layout(
+                    title=f"Daily Inactive Users Trend - {date_display}",
+                    xaxis_title="Date",
+                    yaxis_title="Number of Inactive Users",
+                    showlegend=False,
+                    hovermode='x unified'  # Show hover for all points at same x-value
+                )
             
-            # Show the trend plot
-            st.plotly_chart(trend_fig, use_container_width=True)
+                # Show the trend plot
+                st.plotly_chart(trend_fig, use_container_width=True)
             
             # Add expandable section for inactive users list
             st.subheader("Detailed Inactive Users List")
             with st.expander("View All Inactive Users", expanded=False):
                 if not inactive_users.empty:
                     search_inactive_detail = st.text_input("Search inactive users", key="search_inactive_detail")
-                    filtered_inactive_detail = filter_dataframe_search(inactive_users[['Email', 'Active Days', 'Subscription Included Reqs', 'Usage Based Reqs', 'Manager', 'Director', 'Department']], search_inactive_detail)
+                    filtered_inactive_detail = search_user_list("search_inactive_detail", inactive_users, search_inactive_detail)
                     if filtered_inactive_detail.empty:
                         st.info("No matching users found")
                     else:
-                        st.dataframe(filtered_inactive_detail.sort_values(['Active Days', 'Email'], ascending=[False, True]), width=1200)
+                        st.dataframe(filtered_inactive_detail, width=1200)
                 else:
                     st.info("No inactive users found in this period")
             
             # Add spacing before next section
-            st.write("")
-            st.markdown("---")
+            section_break()
 
         else:
             st.error("Error processing user statistics")
@@ -1552,8 +1731,8 @@ else:  # Dashboard page
             df['Date'] = pd.to_datetime(df['Date'])
         
         # Get min and max dates as datetime.date objects
-        min_date = df['Date'].dt.date.min()
-        max_date = df['Date'].dt.date.max()
+        min_date = df['Date'].min().date()
+        max_date = df['Date'].max().date()
         
         # Create date inputs with proper date objects and min/max restrictions
         start_date = st.sidebar.date_input(
@@ -1581,18 +1760,20 @@ else:  # Dashboard page
                 start_date = max(start_date, min_date)
                 end_date = min(end_date, max_date)
         
-        # Filter data by date range using datetime.date objects
-        mask = (df['Date'].dt.date >= start_date) & (df['Date'].dt.date <= end_date)
-        df_filtered = df[mask]
+        # Filter data by date range
+        df_filtered = slice_date_range(df, start_date, end_date)
 
         # Get user statistics for filtered data
-        user_stats = get_user_stats(df_filtered)
+        user_stats = get_cached_user_stats(df_filtered)
+        activity_codes = get_activity_codes(user_stats)
+        activity_masks = get_activity_masks(activity_codes)
+        activity_counts = count_activity_categories(activity_codes)
         
         # Other filters
         search_text = st.sidebar.text_input("Search by Email")
         
-        # Get unique directors for filters
-        directors = sorted(user_stats['Director'].unique().tolist())
+        # Get unique directors for filters (Director is categorical, so its categories are already sorted and unique)
+        directors = user_stats['Director'].cat.remove_unused_categories().cat.categories.tolist()
         
         selected_director = st.sidebar.selectbox(
             "Filter by Director",
@@ -1610,24 +1791,13 @@ else:  # Dashboard page
         with col1:
             st.metric("Total Users", len(user_stats))
         with col2:
-            active_users = len(user_stats[
-                (user_stats['Subscription Included Reqs'] > 0) |
-                (user_stats['Usage Based Reqs'] > 0)
-            ])
+            active_users = activity_counts['active']
             st.metric("Active Users", active_users)
         with col3:
-            dormant_users = len(user_stats[
-                (user_stats['Active Days'] > 0) & 
-                (user_stats['Subscription Included Reqs'] == 0) &
-                (user_stats['Usage Based Reqs'] == 0)
-            ])
+            dormant_users = activity_counts['dormant']
             st.metric("Dormant Users", dormant_users)
         with col4:
-            inactive_users = len(user_stats[
-                (user_stats['Active Days'] == 0) &
-                (user_stats['Subscription Included Reqs'] == 0) &
-                (user_stats['Usage Based Reqs'] == 0)
-            ])
+            inactive_users = activity_counts['inactive']
             st.metric("Inactive Users", inactive_users)
         with col5:
             total_subscription_reqs = user_stats['Subscription Included Reqs'].sum()
@@ -1637,64 +1807,21 @@ else:  # Dashboard page
             st.metric("Total Usage Based Requests", f"{total_usage_reqs:,}")
             
         # Add spacing before next section
-        st.write("")
-        st.write("---")
-        st.write("")
-        
-        # # Display users who exceeded 500 requests
-        # high_usage_users = user_stats[
-        #     (user_stats['Usage Based Reqs'] > 0) &
-        #     (user_stats['Subscription Included Reqs'] > 0)
-        # ]
-        
-        # # Apply filters to high usage users
-        # filtered_high_usage = high_usage_users.copy()
-        # if search_text:
-        #     filtered_high_usage = filter_dataframe_search(filtered_high_usage, search_text)
-        # if selected_director != "All":
-        #     filtered_high_usage = filtered_high_usage[filtered_high_usage['Director'] == selected_director]
-            
-        # total_high_usage = len(filtered_high_usage)
-        # st.subheader("Top 3 Most Active Cursor Users")
-        # st.caption(f"Out of {total_high_usage} users who exceed 500 requests or using premium models")
-        
-        # if total_high_usage > 0:
-        #     high_usage_df = filtered_high_usage[['Email', 'Active Days', 'Subscription Included Reqs', 'Usage Based Reqs', 'Manager', 'Director', 'Department']].sort_values('Subscription Included Reqs', ascending=False).head(3)
-        #     st.dataframe(high_usage_df, width=1200)
-            
-        #     # Add download button for all users (not just top 3)
-        #     full_high_usage_df = filtered_high_usage[['Email', 'Active Days', 'Subscription Included Reqs', 'Usage Based Reqs', 'Manager', 'Director', 'Department']].sort_values('Subscription Included Reqs', ascending=False)
-        #     csv = full_high_usage_df.to_csv(index=False)
-        # else:
-        #     st.info("No users found with both subscription included and usage based requests in the selected date range")
-            
-        # Add spacing before next section
-        # st.write("")
-        # st.write("---")
-        st.write("")
+        section_break()
         
-        # Apply filters
-        filtered_stats = user_stats.copy()
+        # Apply filters (each filter returns a new frame, so the cached stats are never modified)
+        filtered_stats = user_stats
         if search_text:
-            filtered_stats = filter_dataframe_search(filtered_stats, search_text)
+            filtered_stats = search_user_list("search_text", filtered_stats, search_text)
         if selected_director != "All":
             filtered_stats = filtered_stats[filtered_stats['Director'] == selected_director]
         
-        # Split users into three categories
-        active_users = filtered_stats[
-            (filtered_stats['Subscription Included Reqs'] > 0) |
-            (filtered_stats['Usage Based Reqs'] > 0)
-        ]
-        dormant_users = filtered_stats[
-            (filtered_stats['Subscription Included Reqs'] == 0) & 
-            (filtered_stats['Usage Based Reqs'] == 0) & 
-            (filtered_stats['Active Days'] > 0)
-        ]
-        inactive_users = filtered_stats[
-            (filtered_stats['Subscription Included Reqs'] == 0) & 
-            (filtered_stats['Usage Based Reqs'] == 0) & 
-            (filtered_stats['Active Days'] == 0)
-        ]
+        # Split users into three categories (filters keep the user_stats index, which maps rows back to mask positions);
+        # rows and table columns are selected together so each category is copied only once
+        filtered_rows = user_stats.index.get_indexer(filtered_stats.index)
+        active_users = filtered_stats.loc[activity_masks['active'][filtered_rows], DISPLAY_COLUMNS]
+        dormant_users = filtered_stats.loc[activity_masks['dormant'][filtered_rows], DISPLAY_COLUMNS]
+        inactive_users = filtered_stats.loc[activity_masks['inactive'][filtered_rows], DISPLAY_COLUMNS]
         
         # Display active users table first
         st.subheader(f"Active Users ({len(active_users)} users)")
@@ -1705,11 +1832,11 @@ else:  # Dashboard page
         - **Usage Based Reqs**: Number of usage based requests made to AI
         """)
         if len(active_users) > 0:
-            active_df = active_users[['Email', 'Active Days', 'Subscription Included Reqs', 'Usage Based Reqs', 'Manager', 'Director', 'Department']].sort_values('Subscription Included Reqs', ascending=False)
+            active_df = active_users.sort_values('Subscription Included Reqs', ascending=False)
             st.dataframe(active_df, width=1200)
             
             # Add download button
-            csv = active_df.to_csv(index=False)
+            csv = get_csv_bytes(active_df)
             st.download_button(
                 label="Download as CSV",
                 data=csv,
@@ -1720,9 +1847,7 @@ else:  # Dashboard page
             st.info("No active users found with current filters")
         
         # Add spacing between tables
-        st.write("")
-        st.write("---")
-        st.write("")
+        section_break()
         
         # Display dormant users table
         st.subheader(f"Dormant Users ({len(dormant_users)} users)")
@@ -1733,11 +1858,11 @@ else:  # Dashboard page
         - **Usage Based Reqs**: Will be 0 as these users haven't made any usage based requests
         """)
         if len(dormant_users) > 0:
-            dormant_df = dormant_users[['Email', 'Active Days', 'Subscription Included Reqs', 'Usage Based Reqs', 'Manager', 'Director', 'Department']].sort_values('Active Days', ascending=False)
+            dormant_df = dormant_users.sort_values('Active Days', ascending=False)
             st.dataframe(dormant_df, width=1200)
             
             # Add download button
-            csv = dormant_df.to_csv(index=False)
+            csv = get_csv_bytes(dormant_df)
             st.download_button(
                 label="Download as CSV",
                 data=csv,
@@ -1748,9 +1873,7 @@ else:  # Dashboard page
             st.info("No dormant users found with current filters")
             
         # Add spacing between tables
-        st.write("")
-        st.write("---")
-        st.write("")
+        section_break()
         
         # Display inactive users table last
         st.subheader(f"Inactive Users ({len(inactive_users)} users)")
@@ -1760,11 +1883,11 @@ else:  # Dashboard page
         - **Subscription Included Reqs**: Will be 0 as these users haven't made any AI requests
         """)
         if len(inactive_users) > 0:
-            inactive_df = inactive_users[['Email', 'Active Days', 'Subscription Included Reqs', 'Usage Based Reqs', 'Manager', 'Director', 'Department']].sort_values('Email')
+            inactive_df = inactive_users.sort_values('Email')
             st.dataframe(inactive_df, width=1200)
             
             # Add download button
-            csv = inactive_df.to_csv(index=False)
+            csv = get_csv_bytes(inactive_df)
             st.download_button(
                 label="Download as CSV",
                 data=csv,
@@ -1,13 +1,32 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
+import numpy as np
 from datetime import datetime, timezone
 import os
 from dotenv import load_dotenv
 import time
+try:
+    import orjson
+except ImportError:  # Optional speedup, fall back to the standard library
+    orjson = None
 
 # Load environment variables
 load_dotenv()
 
+# Shared HTTP session so API fetches reuse keep-alive connections and retry transient gateway errors.
+# The usage endpoint is a read-only query, so retrying its POST is safe.
+CURSOR_API_HTTP = requests.Session()
+CURSOR_API_HTTP.mount('https://', HTTPAdapter(max_retries=Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=[502, 503, 504],
+    allowed_methods=frozenset(['POST']),
+    raise_on_status=False
+)))
+CURSOR_API_TIMEOUT = (3.05, 60)  # (connect, read) seconds
+
 def get_cursor_api_data(start_date_epoch=None, end_date_epoch=None):
     """
     Fetch data from Cursor API
@@ -48,9 +67,12 @@ def get_cursor_api_data(start_date_epoch=None, end_date_epoch=None):
             'endDate': end_date_epoch * 1000       # Convert to milliseconds
         }
         
-        response = requests.post(api_url, headers=headers, json=data)
+        response = CURSOR_API_HTTP.post(api_url, headers=headers, json=data, timeout=CURSOR_API_TIMEOUT)
         response.raise_for_status()
         
+        # orjson decodes the (multi-MB) payload straight from bytes
+        if orjson is not None:
+            return orjson.loads(response.content)
         return response.json()
     
     except requests.exceptions.RequestException as e:
@@ -74,43 +96,73 @@ def transform_cursor_data_to_dataframe(api_data):
         print("No data found in API response")
         return pd.DataFrame()
     
-    records = []
+    # Gather each column as a plain list in one pass over the entries
+    dates = []
+    emails = []
+    is_active = []
+    subscription_reqs = []
+    usage_reqs = []
     
     for entry in api_data['data']:
-        # Extract the required fields mapping from API to our expected format
-        record = {
-            'Date': convert_to_iso_format(entry.get('date')),
-            'Email': entry.get('email', ''),
-            'Is Active': bool(entry.get('isActive', False)),
-            'Subscription Included Reqs': int(entry.get('subscriptionIncludedReqs', 0)),
-            'Usage Based Reqs': int(entry.get('usageBasedReqs', 0))
-        }
+        email = entry.get('email', '')
         
         # Validate that we have required data
-        if record['Email'] and record['Date']:
-            records.append(record)
+        if not email:
+            continue
+        
+        # Extract the required fields mapping from API to our expected format
+        dates.append(entry.get('date'))
+        emails.append(email)
+        is_active.append(bool(entry.get('isActive', False)))
+        subscription_reqs.append(int(entry.get('subscriptionIncludedReqs', 0)))
+        usage_reqs.append(int(entry.get('usageBasedReqs', 0)))
     
-    if not records:
+    if not emails:
         print("No valid records found in API data")
         return pd.DataFrame()
     
-    df = pd.DataFrame(records)
-    
-    # Convert Date column to datetime
-    df['Date'] = pd.to_datetime(df['Date'], format='%Y-%m-%dT%H:%M:%S.%fZ', utc=True)
+    df = pd.DataFrame({
+        'Date': parse_api_dates(dates),
+        'Email': emails,
+        'Is Active': is_active,
+        'Subscription Included Reqs': np.asarray(subscription_reqs, dtype='int32'),
+        'Usage Based Reqs': np.asarray(usage_reqs, dtype='int32')
+    })
     
     print(f"Transformed {len(df)} records from API data")
     return df
 
-def convert_to_iso_format(date_input):
+def parse_api_dates(date_inputs):
     """
-    Convert various date formats to ISO format expected by our system
+    Convert a column of API dates to UTC datetimes
+    
+    Args:
+        date_inputs (list): Dates as epoch numbers (seconds or milliseconds) or strings
+    
+    Returns:
+        pd.DatetimeIndex: UTC datetimes at microsecond precision
+    """
+    if all(isinstance(d, (int, float)) for d in date_inputs):
+        # Epoch numbers convert in one vectorized step, no per-row datetime/string round-trip
+        epochs = np.asarray(date_inputs, dtype='f8')
+        # Greater than 10 billion means milliseconds, otherwise seconds
+        micros = np.where(epochs > 1e10, epochs * 1e3, epochs * 1e6)
+        return pd.to_datetime(np.rint(micros).astype('i8'), unit='us', utc=True)
+    
+    # Mixed or string dates go through the general per-value conversion, without a string round-trip.
+    # Like the stored ISO format, the wall-clock time is read as UTC.
+    wall_times = [convert_to_datetime(d).replace(tzinfo=None) for d in date_inputs]
+    return pd.to_datetime(wall_times).tz_localize('UTC')
+
+def convert_to_datetime(date_input):
+    """
+    Convert various date formats to a datetime
     
     Args:
         date_input: Date in various formats (epoch, ISO string, etc.)
     
     Returns:
-        str: Date in YYYY-MM-DDThh:mm:ss.sssZ format
+        datetime: Parsed date (timezone-aware for epochs and the current-time fallback)
     """
     if isinstance(date_input, (int, float)):
         # Handle both seconds and milliseconds epoch time
@@ -129,7 +181,19 @@ def convert_to_iso_format(date_input):
         # Fallback to current time
         dt = datetime.now(timezone.utc)
     
-    return dt.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+    return dt
+
+def convert_to_iso_format(date_input):
+    """
+    Convert various date formats to ISO format expected by our system
+    
+    Args:
+        date_input: Date in various formats (epoch, ISO string, etc.)
+    
+    Returns:
+        str: Date in YYYY-MM-DDThh:mm:ss.sssZ format
+    """
+    return convert_to_datetime(date_input).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
 
 def fetch_and_save_cursor_data():
     """
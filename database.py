@@ -1,35 +1,123 @@
 import sqlite3
+import threading
+import atexit
+import weakref
 from datetime import datetime
 import pandas as pd
 
+# One connection per thread, reused across calls instead of reconnecting each time. Streamlit runs
+# every rerun on a fresh script thread, so in the app a connection lasts about one rerun (reused by
+# all queries within it); long-lived threads such as the cursor_api.py and load_managers.py scripts
+# keep theirs for the whole run.
+_local = threading.local()
+
+class _Connection(sqlite3.Connection):
+    """sqlite3 connection that supports weak references, so exit cleanup doesn't keep it alive"""
+
+# Open connections, closed at interpreter exit; a finished thread's connection still closes on collection
+_open_connections = weakref.WeakSet()
+
+@atexit.register
+def _close_connections():
+    """Close every still-open connection so SQLite checkpoints and removes the WAL file"""
+    for db in list(_open_connections):
+        db.close()
+
+# Copies manager/director/department from manager_data onto matching metrics rows
+MANAGER_UPDATE_SQL = '''
+    UPDATE metrics_data
+    SET manager = m.manager,
+        director = m.director,
+        department = m.department
+    FROM manager_data AS m
+    WHERE metrics_data.email = m.email
+'''
+
+# Staging table for save_data_to_db; TEMP tables live only for this connection
+UPLOAD_STAGING_SQL = '''
+    CREATE TEMP TABLE IF NOT EXISTS upload_metrics (
+        date INTEGER NOT NULL,
+        email TEXT NOT NULL,
+        is_active INTEGER NOT NULL,
+        subscription_included_reqs INTEGER NOT NULL,
+        usage_based_reqs INTEGER NOT NULL
+    )
+'''
+
+# Bump when init_db gains a new table, column or migration so existing databases re-run it
+SCHEMA_VERSION = 1
+
+# Metrics table columns; date holds microseconds since the Unix epoch (UTC)
+METRICS_DATA_COLUMNS = '''(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date INTEGER NOT NULL,
+    email TEXT NOT NULL,
+    is_active INTEGER NOT NULL,
+    subscription_included_reqs INTEGER NOT NULL,
+    "Usage Based Reqs" INTEGER DEFAULT 0,
+    manager TEXT,
+    director TEXT,
+    department TEXT
+)'''
+
+# Rows fetched per batch when loading metrics_data, bounding the Python objects alive at once
+LOAD_CHUNK_ROWS = 50_000
+
+# Compact dtypes applied while reading: 0/1 flags stay one byte per row (sums and max() behave
+# the same as with bool) and request counts fit comfortably in int32
+METRICS_LOAD_DTYPES = {
+    'Is Active': 'uint8',
+    'Subscription Included Reqs': 'int32',
+    'Usage Based Reqs': 'int32'
+}
+
+def to_epoch_micros(dates):
+    """Convert a datetime Series to integer microseconds since the Unix epoch (naive values are UTC)"""
+    if dates.dt.tz is None:
+        dates = dates.dt.tz_localize('UTC')
+    return (dates - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(microseconds=1)
+
 def get_db():
-    """Get SQLite database connection"""
-    db = sqlite3.connect('cursor_metrics.db')
-    db.row_factory = sqlite3.Row
+    """Get this thread's SQLite database connection, opening it on first use"""
+    db = getattr(_local, 'db', None)
+    if db is None:
+        # Implicit transactions start with BEGIN IMMEDIATE, taking the write lock up front
+        # rather than upgrading from a read lock mid-transaction
+        # check_same_thread=False only so _close_connections can close it from the exiting thread;
+        # during normal use each connection stays with the thread that opened it
+        db = sqlite3.connect('cursor_metrics.db', isolation_level='IMMEDIATE', check_same_thread=False,
+                             factory=_Connection)
+        db.row_factory = sqlite3.Row
+        # WAL lets readers run alongside a writer, and NORMAL sync is still crash-safe under WAL
+        db.execute('PRAGMA journal_mode = WAL')
+        db.execute('PRAGMA synchronous = NORMAL')
+        db.execute('PRAGMA temp_store = MEMORY')
+        db.execute('PRAGMA cache_size = -64000')  # 64 MB page cache
+        db.execute('PRAGMA mmap_size = 268435456')  # 256 MB of memory-mapped reads
+        _local.db = db
+        _open_connections.add(db)
     return db
 
 def init_db():
     """Initialize database schema"""
     db = get_db()
-    # First check if the Usage Based Reqs column exists
+    # Databases already at the current schema need no checks or migrations
+    if db.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION:
+        return
+    
+    db.execute(f'CREATE TABLE IF NOT EXISTS metrics_data {METRICS_DATA_COLUMNS}')
+    
+    # Check if the Usage Based Reqs column exists (older tables predate it)
     cursor = db.execute("PRAGMA table_info(metrics_data)")
-    columns = [column[1] for column in cursor.fetchall()]
+    column_types = {column[1]: column[2] for column in cursor.fetchall()}
     
-    if 'Usage Based Reqs' not in columns:
+    if 'Usage Based Reqs' not in column_types:
         db.execute('''ALTER TABLE metrics_data 
                      ADD COLUMN "Usage Based Reqs" INTEGER DEFAULT 0''')
     
-    db.execute('''CREATE TABLE IF NOT EXISTS metrics_data (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        date TEXT NOT NULL,
-        email TEXT NOT NULL,
-        is_active INTEGER NOT NULL,
-        subscription_included_reqs INTEGER NOT NULL,
-        "Usage Based Reqs" INTEGER DEFAULT 0,
-        manager TEXT,
-        director TEXT,
-        department TEXT
-    )''')
+    # Older databases stored dates as ISO text; convert them to integer epoch microseconds
+    if column_types.get('date') == 'TEXT':
+        migrate_text_dates(db)
     
     db.execute('''CREATE TABLE IF NOT EXISTS metadata (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -50,6 +138,12 @@ def init_db():
     except:
         pass  # Column already exists
 
+    # One row per (date, email) so uploads can upsert in bulk
+    db.execute('''DELETE FROM metrics_data
+                  WHERE id NOT IN (SELECT MAX(id) FROM metrics_data GROUP BY date, email)''')
+    db.execute('''CREATE UNIQUE INDEX IF NOT EXISTS idx_metrics_data_date_email
+                  ON metrics_data (date, email)''')
+
     # Manager data table
     db.execute('''CREATE TABLE IF NOT EXISTS manager_data (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -59,108 +153,96 @@ def init_db():
         department TEXT
     )''')
     
+    db.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
     db.commit()
-    db.close()
 
-def get_manager_info(email):
-    """Get manager info for a given email"""
-    try:
-        db = get_db()
-        row = db.execute('SELECT * FROM manager_data WHERE email = ?', (email,)).fetchone()
-        db.close()
-        if row:
-            return {
-                'Manager': row['manager'],
-                'Director': row['director'],
-                'Department': row['department']
-            }
-        return {'Manager': '', 'Director': '', 'Department': ''}
-    except Exception as e:
-        print(f"Error getting manager info: {str(e)}")
-        return {'Manager': '', 'Director': '', 'Department': ''}
+def migrate_text_dates(db):
+    """Rebuild metrics_data with integer epoch-microsecond dates in place of ISO text"""
+    rows = pd.read_sql_query('SELECT * FROM metrics_data ORDER BY id', db)
+    dates = to_epoch_micros(pd.to_datetime(rows['date'], format='ISO8601', utc=True))
+    columns = ['id', 'date', 'email', 'is_active', 'subscription_included_reqs', 'Usage Based Reqs',
+               'manager', 'director', 'department']
+    records = list(zip(rows['id'].tolist(), dates.tolist(), *(rows[col].tolist() for col in columns[2:])))
+    
+    # Explicit BEGIN so the DDL commits or rolls back together with the copy
+    with db:
+        db.execute('BEGIN')
+        db.execute('ALTER TABLE metrics_data RENAME TO metrics_data_text_dates')
+        db.execute(f'CREATE TABLE metrics_data {METRICS_DATA_COLUMNS}')
+        db.executemany('''
+            INSERT INTO metrics_data
+            (id, date, email, is_active, subscription_included_reqs, "Usage Based Reqs",
+             manager, director, department)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', records)
+        db.execute('DROP TABLE metrics_data_text_dates')
+    
+    # The dropped copy's pages are left on the freelist; reclaim them once the rebuild has committed
+    # (VACUUM cannot run inside a transaction)
+    db.execute('VACUUM')
 
 def save_data_to_db(df, data_source="file_upload", source_filename=None):
     """Save DataFrame to SQLite database"""
     try:
-        # Convert DataFrame to records
-        records = df.to_dict('records')
+        db = get_db()
         
-        # Add manager and director information to each record
-        for record in records:
-            email = record['Email']
-            manager_info = get_manager_info(email)
-            record['Manager'] = manager_info['Manager']
-            record['Director'] = manager_info['Director']
-            record['Department'] = manager_info['Department']
+        # Build parameter rows column-wise; tolist() yields native Python types for sqlite3
+        dates = to_epoch_micros(df['Date']).tolist()
+        records = list(zip(
+            dates,
+            df['Email'].tolist(),
+            df['Is Active'].tolist(),
+            df['Subscription Included Reqs'].tolist(),
+            df['Usage Based Reqs'].tolist()
+        ))
         
-        # Convert datetime to string
-        for record in records:
-            record['Date'] = record['Date'].strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+        file_size_mb = df.memory_usage(deep=True).sum() / (1024 * 1024)  # Approximate size in MB
         
-        db = get_db()
+        # Connection-local staging table for the upload; emptied again before each commit
+        db.execute(UPLOAD_STAGING_SQL)
         
-        # Instead of deleting, we'll update existing records or insert new ones
-        for record in records:
-            # Check if record exists
-            existing = db.execute('''
-                SELECT id FROM metrics_data 
-                WHERE date = ? AND email = ?
-            ''', (record['Date'], record['Email'])).fetchone()
+        # Commit on success; roll back partial writes on error so the shared connection stays clean
+        with db:
+            db.executemany('''
+                INSERT INTO temp.upload_metrics
+                (date, email, is_active, subscription_included_reqs, usage_based_reqs)
+                VALUES (?, ?, ?, ?, ?)
+            ''', records)
             
-            if existing:
-                # Update existing record
-                db.execute('''
-                    UPDATE metrics_data 
-                    SET is_active = ?,
-                        subscription_included_reqs = ?,
-                        "Usage Based Reqs" = ?,
-                        manager = ?,
-                        director = ?,
-                        department = ?
-                    WHERE date = ? AND email = ?
-                ''', (
-                    record['Is Active'],
-                    record['Subscription Included Reqs'],
-                    record['Usage Based Reqs'],
-                    record['Manager'],
-                    record['Director'],
-                    record['Department'],
-                    record['Date'],
-                    record['Email']
-                ))
-            else:
-                # Insert new record
-                db.execute('''
-                    INSERT INTO metrics_data 
-                    (date, email, is_active, subscription_included_reqs, "Usage Based Reqs", 
-                     manager, director, department)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    record['Date'],
-                    record['Email'],
-                    record['Is Active'],
-                    record['Subscription Included Reqs'],
-                    record['Usage Based Reqs'],
-                    record['Manager'],
-                    record['Director'],
-                    record['Department']
-                ))
-        
-        # Update metadata
-        file_size_mb = len(str(records)) / (1024 * 1024)  # Approximate size in MB
-        db.execute('''
-            INSERT INTO metadata (upload_date, size_mb, record_count, data_source, source_filename)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (
-            datetime.now().isoformat(),
-            round(file_size_mb, 2),
-            len(records),
-            data_source,
-            source_filename
-        ))
+            # Attach manager info with one join inside SQLite, then update existing records or
+            # insert new ones; rows apply in upload order so later duplicates win
+            db.execute('''
+                INSERT INTO metrics_data 
+                (date, email, is_active, subscription_included_reqs, "Usage Based Reqs", 
+                 manager, director, department)
+                SELECT u.date, u.email, u.is_active, u.subscription_included_reqs, u.usage_based_reqs,
+                       COALESCE(m.manager, ''), COALESCE(m.director, ''), COALESCE(m.department, '')
+                FROM temp.upload_metrics AS u
+                LEFT JOIN manager_data AS m ON m.email = u.email
+                WHERE true
+                ORDER BY u.rowid
+                ON CONFLICT (date, email) DO UPDATE
+                SET is_active = excluded.is_active,
+                    subscription_included_reqs = excluded.subscription_included_reqs,
+                    "Usage Based Reqs" = excluded."Usage Based Reqs",
+                    manager = excluded.manager,
+                    director = excluded.director,
+                    department = excluded.department
+            ''')
+            db.execute('DELETE FROM temp.upload_metrics')
+            
+            # Update metadata
+            db.execute('''
+                INSERT INTO metadata (upload_date, size_mb, record_count, data_source, source_filename)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (
+                datetime.now().isoformat(),
+                round(file_size_mb, 2),
+                len(records),
+                data_source,
+                source_filename
+            ))
         
-        db.commit()
-        db.close()
         return True
             
     except Exception as e:
@@ -172,39 +254,46 @@ def get_current_file_info():
     try:
         db = get_db()
         row = db.execute('SELECT * FROM metadata ORDER BY id DESC LIMIT 1').fetchone()
-        db.close()
         return dict(row) if row else None
     except Exception as e:
         print(f"Error getting file metadata: {str(e)}")
         return None
 
+def _convert_metrics_chunk(chunk):
+    """Convert one batch of metrics rows' stored epoch microseconds back to UTC datetimes"""
+    chunk['Date'] = pd.to_datetime(chunk['Date'], unit='us', utc=True)
+    return chunk
+
 def load_data_from_db():
     """Load data from SQLite database"""
     try:
         db = get_db()
-        # Get records
-        cursor = db.execute('SELECT * FROM metrics_data')
-        records = [dict(row) for row in cursor.fetchall()]
-        db.close()
+        # Read straight into the app's column names and dtypes, in fixed-size batches
+        chunks = pd.read_sql_query('''
+            SELECT date AS "Date",
+                   email AS "Email",
+                   is_active AS "Is Active",
+                   subscription_included_reqs AS "Subscription Included Reqs",
+                   "Usage Based Reqs",
+                   manager AS "Manager",
+                   director AS "Director",
+                   department AS "Department"
+            FROM metrics_data
+            ORDER BY id
+        ''', db, chunksize=LOAD_CHUNK_ROWS, dtype=METRICS_LOAD_DTYPES)
+        
+        # Convert each batch's dates before it is concatenated
+        df = pd.concat([_convert_metrics_chunk(chunk) for chunk in chunks], ignore_index=True)
         
-        if not records:
+        if df.empty:
             return None
             
-        # Convert to DataFrame
-        df = pd.DataFrame(records)
-        # Convert date strings back to datetime (keeping time information)
-        df['Date'] = pd.to_datetime(df['date'])
-        df['Email'] = df['email']
-        df['Is Active'] = df['is_active'].astype(bool)
-        df['Subscription Included Reqs'] = df['subscription_included_reqs']
-        df['Usage Based Reqs'] = df['Usage Based Reqs'].astype(int)  # Convert to integer
-        df['Manager'] = df['manager']
-        df['Director'] = df['director']
-        df['Department'] = df['department']
+        # Keep rows in date order so date ranges can be sliced with binary search
+        df = df.sort_values('Date', kind='stable').reset_index(drop=True)
         
-        # Drop SQLite-specific columns
-        df = df.drop(columns=['id', 'date', 'email', 'is_active', 'subscription_included_reqs', 
-                            'manager', 'director', 'department'])
+        # Repeated string columns as categoricals so groupby/isin/sort work on integer codes
+        for col in ['Email', 'Manager', 'Director', 'Department']:
+            df[col] = df[col].astype('category')
         
         return df
     except Exception as e:
@@ -215,10 +304,9 @@ def delete_current_file():
     """Delete current file data and metadata"""
     try:
         db = get_db()
-        db.execute('DELETE FROM metrics_data')
-        db.execute('DELETE FROM metadata')
-        db.commit()
-        db.close()
+        with db:
+            db.execute('DELETE FROM metrics_data')
+            db.execute('DELETE FROM metadata')
         return True
     except Exception as e:
         print(f"Error deleting file: {str(e)}")
@@ -230,32 +318,9 @@ def update_metrics_manager_data():
         db = get_db()
         
         # Update metrics_data with latest manager info
-        db.execute('''
-            UPDATE metrics_data
-            SET manager = (
-                SELECT manager 
-                FROM manager_data 
-                WHERE manager_data.email = metrics_data.email
-            ),
-            director = (
-                SELECT director 
-                FROM manager_data 
-                WHERE manager_data.email = metrics_data.email
-            ),
-            department = (
-                SELECT department 
-                FROM manager_data 
-                WHERE manager_data.email = metrics_data.email
-            )
-            WHERE EXISTS (
-                SELECT 1 
-                FROM manager_data 
-                WHERE manager_data.email = metrics_data.email
-            )
-        ''')
+        with db:
+            db.execute(MANAGER_UPDATE_SQL)
         
-        db.commit()
-        db.close()
         print("✅ Manager data updated in metrics_data table successfully!")
         return True
             
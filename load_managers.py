@@ -1,6 +1,5 @@
 import pandas as pd
-import sqlite3
-from database import update_metrics_manager_data
+from database import get_db, update_metrics_manager_data
 
 def load_manager_data():
     """One-time function to load manager data into SQLite database"""
@@ -8,26 +7,31 @@ def load_manager_data():
         # Read the CSV file
         df = pd.read_csv('Reporting Manager.csv')
         
-        # Connect to database
-        db = sqlite3.connect('cursor_metrics.db')
+        # Reuse the shared connection (and its pragmas) that update_metrics_manager_data uses below
+        db = get_db()
         
-        # Clear existing data
-        db.execute('DELETE FROM manager_data')
+        # Map the CSV columns onto manager_data; missing values become empty strings
+        managers = df.rename(columns={
+            'Work Email': 'email',
+            'Manager: Name': 'manager',
+            'Director': 'director',
+            'Department Name (from Employment)': 'department'
+        })[['email', 'manager', 'director', 'department']]
+        managers = managers.astype({'email': str})
+        for col in ['manager', 'director', 'department']:
+            managers[col] = managers[col].fillna('').astype(str)
         
-        # Save new data
-        for _, row in df.iterrows():
-            db.execute('''
-                INSERT INTO manager_data (email, manager, director, department)
+        # Replace rows in place by their unique email, then drop rows the CSV no longer lists, in one
+        # transaction (rolled back on error). REPLACE gives every loaded row a new AUTOINCREMENT id,
+        # so anything at or below the previous maximum id is stale.
+        with db:
+            previous_max_id = db.execute('SELECT COALESCE(MAX(id), 0) FROM manager_data').fetchone()[0]
+            db.executemany('''
+                INSERT OR REPLACE INTO manager_data (email, manager, director, department)
                 VALUES (?, ?, ?, ?)
-            ''', (
-                str(row['Work Email']),
-                str(row['Manager: Name']) if pd.notna(row['Manager: Name']) else '',
-                str(row['Director']) if pd.notna(row['Director']) else '',
-                str(row['Department Name (from Employment)']) if pd.notna(row['Department Name (from Employment)']) else ''
-            ))
+            ''', list(zip(*(managers[col].tolist() for col in managers.columns))))
+            db.execute('DELETE FROM manager_data WHERE id <= ?', (previous_max_id,))
         
-        db.commit()
-        db.close()
         print("✅ Manager data loaded successfully!")
         
         # Update metrics_data table with new manager information